@@ -0,0 +1,222 @@
+import heapq
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+
+SUGESTOES_MAX = 5
+SUGESTOES_PREFIXO_MIN = 2  # Palavras menores que isso não são usadas na busca
+SUGESTOES_INTERSECAO_MAX = 5000  # Palavra presente em mais endereços que isso é genérica demais
+SUGESTOES_CANDIDATOS_MAX = 500  # Acima disso a busca é genérica demais para sugerir algo
+SUGESTOES_TRIGRAMA_MAX_ENDERECOS = 300  # Trigramas mais comuns que isso são ignorados
+SUGESTOES_SIMILARIDADE_MIN = 0.5  # Fração dos trigramas digitados que o endereço precisa conter
+
+# Parte após a rua que começa com o número da casa: "96", "nº 96", "96 apto 201"
+NUMERO_CASA = re.compile(r"(?:n|no|num|numero)?\s*\d+\b")
+
+
+def chave_indice(texto):
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("utf-8")
+    return " ".join(re.sub(r"[^\w\s]", " ", texto).lower().split())
+
+
+def trigramas(token):
+    token_com_borda = f" {token} "
+    return {token_com_borda[i : i + 3] for i in range(len(token_com_borda) - 2)}
+
+
+def separar_rua(endereco):
+    # Endereços no formato fixo das lojas: "Rua X, 96, Bairro, Cidade" -> ("Rua X", "Bairro, Cidade")
+    partes = [parte.strip() for parte in endereco.split(",")]
+    partes = [parte for parte in partes if parte and not parte.isdigit()]
+    if len(partes) < 2:
+        return None
+    return partes[0], ", ".join(partes[1:])
+
+
+def partes_nominatim(endereco):
+    # Endereço estruturado do Nominatim (addressdetails=True) -> (rua, "bairro, cidade, UF, Brasil").
+    # O número da casa vem em "house_number" e nunca entra no índice.
+    if endereco.get("country_code") != "br" or not endereco.get("road"):
+        return None
+    bairro = endereco.get("suburb") or endereco.get("neighbourhood") or endereco.get("quarter")
+    cidade = (
+        endereco.get("city")
+        or endereco.get("town")
+        or endereco.get("village")
+        or endereco.get("municipality")
+    )
+    if not cidade:
+        return None
+    uf = endereco.get("ISO3166-2-lvl4", "").rpartition("-")[2]
+    return endereco["road"], ", ".join(filter(None, [bairro, cidade, uf, "Brasil"]))
+
+
+def prefixos_token(token):
+    # Números de rua ("Rua 7 de Setembro") são indexados a partir de um dígito
+    inicio = 1 if token.isdigit() else SUGESTOES_PREFIXO_MIN
+    return (token[:i] for i in range(inicio, len(token) + 1))
+
+
+class IndiceEnderecos:
+    """Índice em memória de prefixos e trigramas para sugerir endereços em nível de rua.
+
+    Os endereços são guardados sem número da casa; o número digitado pelo usuário
+    é mantido na sugestão. Endereços aprendidos das pesquisas ficam em um LRU
+    limitado a ``max_aprendidos`` entradas; os da base (lojas e CEPs) nunca saem.
+    """
+
+    __slots__ = (
+        "_lock",
+        "_enderecos",
+        "_ids",
+        "_aprendidos",
+        "_proximo_id",
+        "_prefixos",
+        "_trigramas",
+        "max_aprendidos",
+    )
+
+    def __init__(self, max_aprendidos):
+        self._lock = threading.Lock()
+        self._enderecos = {}  # id -> (rua, resto)
+        self._ids = {}  # chave normalizada -> id
+        self._aprendidos = OrderedDict()  # chave normalizada -> id, em ordem de uso
+        self._proximo_id = 0
+        self._prefixos = {}  # prefixo de palavra -> ids
+        self._trigramas = {}  # trigrama -> ids
+        self.max_aprendidos = max_aprendidos
+
+    def adicionar(self, rua, resto, aprendido=False):
+        chave = chave_indice(", ".join(filter(None, [rua, resto])))
+        if not chave:
+            return
+        with self._lock:
+            if chave in self._ids:
+                if chave in self._aprendidos:
+                    if aprendido:
+                        self._aprendidos.move_to_end(chave)
+                    else:  # Passou a fazer parte da base: não expira mais
+                        del self._aprendidos[chave]
+                return
+            id_endereco = self._proximo_id
+            self._proximo_id += 1
+            self._enderecos[id_endereco] = (rua, resto)
+            self._ids[chave] = id_endereco
+            trigramas_endereco = set()
+            for token in set(chave.split()):
+                for prefixo in prefixos_token(token):
+                    self._prefixos.setdefault(prefixo, set()).add(id_endereco)
+                trigramas_endereco |= trigramas(token)
+            for trigrama in trigramas_endereco:
+                self._trigramas.setdefault(trigrama, set()).add(id_endereco)
+            if aprendido:
+                self._aprendidos[chave] = id_endereco
+                while len(self._aprendidos) > self.max_aprendidos:
+                    self._remover(*self._aprendidos.popitem(last=False))
+
+    def _remover(self, chave, id_endereco):
+        trigramas_endereco = set()
+        for token in set(chave.split()):
+            for prefixo in prefixos_token(token):
+                self._descartar(self._prefixos, prefixo, id_endereco)
+            trigramas_endereco |= trigramas(token)
+        for trigrama in trigramas_endereco:
+            self._descartar(self._trigramas, trigrama, id_endereco)
+        del self._enderecos[id_endereco]
+        del self._ids[chave]
+
+    @staticmethod
+    def _descartar(postings, chave, id_endereco):
+        ids = postings.get(chave)
+        if ids is not None:
+            ids.discard(id_endereco)
+            if not ids:
+                del postings[chave]
+
+    def sugerir(self, texto, limite=SUGESTOES_MAX):
+        if not isinstance(texto, str):
+            return []
+        # O número da casa é a primeira parte após a rua que começa com um número
+        partes = texto.split(",")
+        numero = None
+        for i in range(1, len(partes)):
+            if NUMERO_CASA.match(chave_indice(partes[i])):
+                numero = partes.pop(i).strip()
+                break
+        tokens = [
+            t
+            for t in chave_indice(", ".join(partes)).split()
+            if t.isdigit() or len(t) >= SUGESTOES_PREFIXO_MIN
+        ]
+        if not tokens:
+            return []
+        numero_inferido = False
+        with self._lock:
+            ids = self._buscar_prefixos(tokens, limite)
+            if not ids and numero is None:
+                # Sem vírgulas ("rua lavras 96 savassi"): tenta sem o último número digitado
+                digitos = [i for i, t in enumerate(tokens) if t.isdigit()]
+                if digitos:
+                    numero = tokens.pop(digitos[-1])
+                    numero_inferido = True
+                    if tokens:
+                        ids = self._buscar_prefixos(tokens, limite)
+            if not ids and tokens:
+                ids = self._buscar_trigramas(tokens, limite)
+            return [self._formatar(i, numero, numero_inferido) for i in ids]
+
+    def _buscar_prefixos(self, tokens, limite):
+        # Intersecta a partir do menor conjunto, para o custo depender da palavra mais rara
+        conjuntos = sorted((self._prefixos.get(t, set()) for t in tokens), key=len)
+        candidatos = conjuntos[0]
+        if len(candidatos) > SUGESTOES_INTERSECAO_MAX:
+            return []
+        for ids in conjuntos[1:]:
+            candidatos = candidatos & ids
+            if not candidatos:
+                return []
+        if len(candidatos) > SUGESTOES_CANDIDATOS_MAX:
+            return []
+        return heapq.nsmallest(limite, candidatos, key=self._ordem)
+
+    def _buscar_trigramas(self, tokens, limite):
+        # Sem casamento de prefixos: procura endereços que contenham a maior parte
+        # dos trigramas digitados, para tolerar erros de digitação
+        trigramas_texto = set()
+        for token in tokens:
+            trigramas_texto |= trigramas(token)
+        # Só os trigramas raros geram candidatos; os comuns são conferidos por candidato
+        seletivos = []
+        comuns = []
+        for trigrama in trigramas_texto:
+            ids = self._trigramas.get(trigrama, ())
+            if len(ids) <= SUGESTOES_TRIGRAMA_MAX_ENDERECOS:
+                seletivos.append(ids)
+            else:
+                comuns.append(ids)
+        compartilhados = Counter()
+        for ids in seletivos:
+            compartilhados.update(ids)
+        minimo = SUGESTOES_SIMILARIDADE_MIN * len(trigramas_texto)
+        pontuados = []
+        for id_endereco, comum in compartilhados.items():
+            if comum + len(comuns) < minimo:
+                continue
+            comum += sum(1 for ids in comuns if id_endereco in ids)
+            if comum >= minimo:
+                pontuados.append((-comum, self._ordem(id_endereco), id_endereco))
+        return [id_endereco for _, _, id_endereco in heapq.nsmallest(limite, pontuados)]
+
+    def _ordem(self, id_endereco):
+        rua, resto = self._enderecos[id_endereco]
+        return (len(rua) + len(resto), rua, resto)
+
+    def _formatar(self, id_endereco, numero, numero_inferido=False):
+        rua, resto = self._enderecos[id_endereco]
+        if numero_inferido and numero in chave_indice(rua).split():
+            numero = None  # Era parte do nome da rua, não o número da casa
+        return ", ".join(filter(None, [rua, numero if rua else None, resto]))
+
+    def __len__(self):
+        return len(self._enderecos)
@@ -1,3 +1,4 @@
+import csv
 import datetime
 import os
 import time
@@ -5,7 +6,15 @@ import json
 import traceback
 import unicodedata
 import re
+import sys
 import streamlit as st
+
+try:  # APIs internas do Streamlit, usadas só no relatório de memória
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:
+    Runtime = None
+    get_script_run_ctx = None
 import requests
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
@@ -13,6 +22,20 @@ import folium
 from streamlit_folium import st_folium
 import pytz
 import gspread
+from indice_enderecos import (
+    IndiceEnderecos,
+    chave_indice,
+    partes_nominatim,
+    separar_rua,
+)
+from memoria import (
+    CacheRotas,
+    RegistroSessoes,
+    ResultadoPesquisa,
+    compactar_geometria,
+    coordenadas_lat_lon,
+    tamanho_profundo,
+)
 
 # --- Configurações ---
 OSRM_BASE_URL = "http://router.project-osrm.org/route/v1/driving/"
@@ -21,6 +44,12 @@ GOOGLE_CREDENTIALS_FILE = "google_credentials.json"
 GOOGLE_LOG_SHEET_NAME = "Log Pesquisas Lojas"
 BRAZIL_TIMEZONE = pytz.timezone("America/Sao_Paulo")
 BRASILAPI_CEP_URL = "https://brasilapi.com.br/api/cep/v1/"
+ROTAS_CACHE_MAX_ENTRADAS = 256  # Geometrias de rota mantidas em memória por processo
+OSRM_CACHE_MAX_ENTRADAS = 512  # Rotas (todas as lojas de cada pesquisa) no cache do OSRM
+RELATORIO_MEMORIA_INTERVALO_SEG = 300  # Intervalo mínimo entre relatórios de memória no console
+# Base de CEPs da área atendida para as sugestões de endereço (formato descrito no version.log, 2.3.0)
+CEP_DATASET_FILE = "ceps_area_atendimento.csv"
+INDICE_APRENDIDOS_MAX = 1000  # Ruas aprendidas das pesquisas mantidas no índice de sugestões
 
 enderecos_lojas = {
     "Loja Lourdes": "Rua Marilia de Dirceu, 161, Lourdes, Belo Horizonte, MG, Brasil",
@@ -72,9 +101,13 @@ def geocodificar_endereco(endereco_original):
     endereco_normalizado = normalize_address(endereco_original)
     geolocator = Nominatim(user_agent=NOMINATIM_USER_AGENT)
     try:
-        location = geolocator.geocode(endereco_normalizado, timeout=10)
+        location = geolocator.geocode(
+            endereco_normalizado, timeout=10, addressdetails=True
+        )
         if location:
-            return location.latitude, location.longitude
+            # A rua vem estruturada pelo Nominatim, já sem o número da casa
+            rua = partes_nominatim(location.raw.get("address", {}))
+            return (location.latitude, location.longitude), rua
         msg = (
             f"❌ Falha na geocodificação de '{endereco_original}'. "
             f"Tentado como '{endereco_normalizado}'. "
@@ -83,7 +116,7 @@ def geocodificar_endereco(endereco_original):
         )
         st.warning(msg)
         adicionar_log(endereco_original, "ERRO_GEOCODIFICACAO", msg)
-        return None
+        return None, None
     except (GeocoderTimedOut, GeocoderServiceError) as e:
         msg = (
             f"🚨 Erro de serviço na geocodificação para '{endereco_original}': {e}. "
@@ -96,7 +129,7 @@ def geocodificar_endereco(endereco_original):
             "ERRO_SERVICO_GEOCODIFICACAO",
             msg + f" Traceback: {traceback.format_exc()}",
         )
-        return None
+        return None, None
     except Exception as e:
         msg = (
             f"⛔ Erro inesperado ao geocodificar '{endereco_original}': {e}. "
@@ -108,10 +141,10 @@ def geocodificar_endereco(endereco_original):
             "ERRO_INESPERADO_GEOCODIFICACAO",
             msg + f" Traceback: {traceback.format_exc()}",
         )
-        return None
+        return None, None
 
 
-@st.cache_data(ttl=3600)
+@st.cache_data(ttl=3600, max_entries=OSRM_CACHE_MAX_ENTRADAS)
 def obter_distancia_osrm(coord_origem, coord_destino):
     if not coord_origem or not coord_destino:
         return None, None, None
@@ -130,7 +163,11 @@ def obter_distancia_osrm(coord_origem, coord_destino):
                 and duration_seconds is not None
                 and geometry is not None
             ):
-                return distance_meters / 1000, duration_seconds, geometry
+                return (
+                    distance_meters / 1000,
+                    duration_seconds,
+                    compactar_geometria(geometry),
+                )
             else:
                 msg = (
                     f"⚠️ OSRM: Dados de rota incompletos ou ausentes entre "
@@ -276,6 +313,160 @@ def fetch_address_from_brasilapi(cep):
         return None
 
 
+# --- Resultado Compacto e Cache Compartilhado de Rotas ---
+
+
+@st.cache_resource
+def obter_cache_rotas():
+    return CacheRotas(ROTAS_CACHE_MAX_ENTRADAS)
+
+
+def obter_geometria_rota(resultado):
+    cache_rotas = obter_cache_rotas()
+    coordenadas = cache_rotas.obter(resultado.chave_rota)
+    if coordenadas is None:
+        # Saiu do cache compartilhado: o cache do OSRM normalmente ainda tem a rota compacta
+        _, _, coordenadas = obter_distancia_osrm(
+            resultado.coords_candidato, resultado.coords_loja_selecionada
+        )
+        if coordenadas is not None:
+            cache_rotas.guardar(resultado.chave_rota, coordenadas)
+    return coordenadas
+
+
+# --- Relatório de Uso de Memória ---
+
+
+@st.cache_resource
+def obter_registro_sessoes():
+    return RegistroSessoes()
+
+
+def registrar_memoria_sessao():
+    if get_script_run_ctx is None:
+        return
+    try:
+        ctx = get_script_run_ctx()
+    except Exception as e:
+        print(f"AVISO: Não foi possível identificar a sessão para o relatório de memória: {e}")
+        return
+    if ctx is None:
+        return
+    estado = {chave: st.session_state[chave] for chave in st.session_state.keys()}
+    obter_registro_sessoes().registrar(ctx.session_id, tamanho_profundo(estado))
+
+
+def obter_rss_max_kb():
+    try:
+        import resource
+    except ImportError:  # Indisponível fora de sistemas Unix
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em bytes no macOS e em kilobytes no Linux
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def obter_tamanhos_caches_streamlit():
+    # Bytes de cada cache do Streamlit (st.cache_data, st.cache_resource, session_state), em KB
+    if Runtime is None or not Runtime.exists():
+        return None
+    estatisticas = Runtime.instance().stats_mgr.get_stats()
+    if isinstance(estatisticas, dict):  # Versões mais novas agrupam as estatísticas por família
+        estatisticas = [stat for grupo in estatisticas.values() for stat in grupo]
+    tamanhos = {}
+    for stat in estatisticas:
+        nome = f"{stat.category_name}:{stat.cache_name}"
+        tamanhos[nome] = tamanhos.get(nome, 0) + stat.byte_length
+    return {nome: round(tamanho / 1024, 1) for nome, tamanho in sorted(tamanhos.items())}
+
+
+def gerar_relatorio_memoria():
+    registro = obter_registro_sessoes()
+    try:
+        if Runtime is not None and Runtime.exists():
+            registro.remover_inativas(Runtime.instance().is_active_session)
+    except Exception as e:
+        print(f"AVISO: Não foi possível verificar sessões ativas: {e}")
+    try:
+        caches_streamlit_kb = obter_tamanhos_caches_streamlit()
+    except Exception as e:
+        print(f"AVISO: Não foi possível obter estatísticas dos caches do Streamlit: {e}")
+        caches_streamlit_kb = None
+    tamanhos = registro.tamanhos()
+    cache_rotas = obter_cache_rotas()
+    return {
+        "sessoes_ativas": len(tamanhos),
+        "session_state_total_kb": round(sum(tamanhos) / 1024, 1),
+        "session_state_maior_kb": round(max(tamanhos, default=0) / 1024, 1),
+        "rotas_em_cache": len(cache_rotas),
+        "rotas_cache_max_entradas": cache_rotas.max_entradas,
+        "rotas_cache_kb": round(cache_rotas.tamanho_bytes() / 1024, 1),
+        "processo_rss_max_kb": obter_rss_max_kb(),
+        "indice_enderecos_entradas": len(obter_indice_enderecos()),
+        "caches_streamlit_kb": caches_streamlit_kb,
+    }
+
+
+def registrar_relatorio_memoria():
+    # Escreve o relatório no console no máximo uma vez por intervalo, para dimensionar os pods
+    if obter_registro_sessoes().relatorio_pendente(RELATORIO_MEMORIA_INTERVALO_SEG):
+        relatorio = gerar_relatorio_memoria()
+        print(f"RELATORIO DE MEMORIA: {json.dumps(relatorio, ensure_ascii=False)}")
+
+
+# --- Índice Local de Endereços (Autocompletar) ---
+
+
+def partes_endereco_cep(cep_data):
+    # Separa os dados de CEP em (rua, "bairro, cidade, UF, Brasil") para o índice
+    resto = format_address_from_cep_data(
+        {
+            "neighborhood": cep_data.get("neighborhood", ""),
+            "city": cep_data.get("city", ""),
+            "state": cep_data.get("state", ""),
+        }
+    )
+    return cep_data.get("street", ""), resto
+
+
+def carregar_dataset_ceps(indice):
+    if not os.path.exists(CEP_DATASET_FILE):
+        msg = (
+            f"Base de CEPs '{CEP_DATASET_FILE}' não encontrada. As sugestões de endereço "
+            "usarão apenas as lojas e as pesquisas bem-sucedidas. Veja o formato no version.log (2.3.0)."
+        )
+        print(f"AVISO: {msg}")
+        adicionar_log("N/A", "AVISO_BASE_CEPS_AUSENTE", msg)
+        return
+    try:
+        with open(CEP_DATASET_FILE, encoding="utf-8", newline="") as arquivo:
+            for linha in csv.DictReader(arquivo):
+                rua, resto = partes_endereco_cep(linha)
+                indice.adicionar(rua, resto)
+                # Também indexa o bairro sozinho, para quem ainda não sabe a rua
+                indice.adicionar("", resto)
+    except Exception as e:
+        print(
+            f"ERRO AO CARREGAR DATASET DE CEPS '{CEP_DATASET_FILE}': {e}\n{traceback.format_exc()}"
+        )
+
+
+@st.cache_resource
+def obter_indice_enderecos():
+    indice = IndiceEnderecos(INDICE_APRENDIDOS_MAX)
+    for endereco_loja in enderecos_lojas.values():
+        indice.adicionar(*separar_rua(endereco_loja))
+    carregar_dataset_ceps(indice)
+    return indice
+
+
+def aplicar_sugestao_endereco(sugestao):
+    st.session_state["current_address_input"] = sugestao
+    # Remove o estado do widget para que ele seja recriado com a sugestão como valor
+    if "main_address_input" in st.session_state:
+        del st.session_state["main_address_input"]
+
+
 # --- Funções para Interagir com Google Sheets (para Log) ---
 
 
@@ -383,7 +574,7 @@ def gerar_mapa_pesquisa(
     loja_mais_proxima_nome,
     coords_loja_mais_proxima,
     endereco_loja_mais_proxima,
-    geometry_route,
+    coordenadas_rota,
 ):
     map_center = coords_candidato if coords_candidato else [-19.919, -43.938]
     m = folium.Map(location=map_center, zoom_start=12)
@@ -402,10 +593,8 @@ def gerar_mapa_pesquisa(
             icon=folium.Icon(color="red", icon="store", prefix="fa"),
         ).add_to(m)
 
-    if geometry_route:
-        inverted_coordinates = [
-            [coord[1], coord[0]] for coord in geometry_route["coordinates"]
-        ]
+    if coordenadas_rota:
+        inverted_coordinates = coordenadas_lat_lon(coordenadas_rota)
         folium.PolyLine(
             inverted_coordinates,
             color="purple",
@@ -462,6 +651,23 @@ with st.container():
         value=st.session_state["current_address_input"],
     )
 
+    # Sugestões do índice local, para o endereço chegar completo ao Nominatim
+    if endereco_ou_cep_input and not is_cep_format(endereco_ou_cep_input):
+        sugestoes = [
+            sugestao
+            for sugestao in obter_indice_enderecos().sugerir(endereco_ou_cep_input)
+            if chave_indice(sugestao) != chave_indice(endereco_ou_cep_input)
+        ]
+        if sugestoes:
+            st.caption("Sugestões de endereço:")
+            for i, sugestao in enumerate(sugestoes):
+                st.button(
+                    sugestao,
+                    key=f"sugestao_endereco_{i}",
+                    on_click=aplicar_sugestao_endereco,
+                    args=(sugestao,),
+                )
+
     col1, col2 = st.columns([1, 1])
     with col1:
         find_store_button = st.button("Encontrar Loja")
@@ -485,6 +691,9 @@ with st.container():
             if cep_data:
                 full_address = format_address_from_cep_data(cep_data)
                 if full_address:
+                    obter_indice_enderecos().adicionar(
+                        *partes_endereco_cep(cep_data), aprendido=True
+                    )
                     st.session_state["current_address_input"] = full_address
                     st.success(f"Endereço encontrado para o CEP {cep_limpo}:")
                     st.markdown(f"**{full_address}**")
@@ -539,16 +748,23 @@ with st.container():
             with st.spinner(
                 "Geocodificando seu endereço e das lojas. Isso pode levar alguns segundos..."
             ):
-                coords_candidato = geocodificar_endereco(endereco_final_para_pesquisa)
+                coords_candidato, rua_candidato = geocodificar_endereco(
+                    endereco_final_para_pesquisa
+                )
 
                 if not coords_candidato:
                     pass
                 else:
+                    # Aprende a rua encontrada pelo Nominatim para as próximas sugestões
+                    if rua_candidato:
+                        obter_indice_enderecos().adicionar(
+                            *rua_candidato, aprendido=True
+                        )
                     coords_lojas = {}
                     lojas_nao_geocodificadas = []
 
                     for nome_loja, endereco_completo_loja in enderecos_lojas.items():
-                        coords = geocodificar_endereco(endereco_completo_loja)
+                        coords, _ = geocodificar_endereco(endereco_completo_loja)
                         if coords:
                             coords_lojas[nome_loja] = coords
                         else:
@@ -576,7 +792,6 @@ with st.container():
                         melhor_distancia_km = float("inf")
                         melhor_tempo_seg = float("inf")
                         loja_mais_proxima_nome = None
-                        endereco_loja_selecionada = None
                         coords_loja_selecionada = None
                         geometry_rota_selecionada = None
 
@@ -592,9 +807,6 @@ with st.container():
                                     melhor_distancia_km = dist_km
                                     melhor_tempo_seg = tempo_seg
                                     loja_mais_proxima_nome = nome_loja
-                                    endereco_loja_selecionada = enderecos_lojas[
-                                        nome_loja
-                                    ]
                                     coords_loja_selecionada = coords_loja
                                     geometry_rota_selecionada = geometry
                             else:
@@ -615,16 +827,18 @@ with st.container():
                             )
 
                         if loja_mais_proxima_nome:
-                            st.session_state["loja_mais_proxima_data"] = {
-                                "endereco_pesquisado": endereco_final_para_pesquisa,
-                                "coords_candidato": coords_candidato,
-                                "loja_mais_proxima_nome": loja_mais_proxima_nome,
-                                "endereco_loja_selecionada": endereco_loja_selecionada,
-                                "coords_loja_selecionada": coords_loja_selecionada,
-                                "melhor_distancia_km": melhor_distancia_km,
-                                "melhor_tempo_seg": melhor_tempo_seg,
-                                "geometry_rota_selecionada": geometry_rota_selecionada,
-                            }
+                            resultado = ResultadoPesquisa(
+                                endereco_pesquisado=endereco_final_para_pesquisa,
+                                coords_candidato=tuple(coords_candidato),
+                                loja_mais_proxima_nome=loja_mais_proxima_nome,
+                                coords_loja_selecionada=tuple(coords_loja_selecionada),
+                                melhor_distancia_km=melhor_distancia_km,
+                                melhor_tempo_seg=melhor_tempo_seg,
+                            )
+                            obter_cache_rotas().guardar(
+                                resultado.chave_rota, geometry_rota_selecionada
+                            )
+                            st.session_state["loja_mais_proxima_data"] = resultado
                             st.session_state["results_displayed"] = True
                             adicionar_log(
                                 endereco_final_para_pesquisa,
@@ -647,29 +861,37 @@ with st.container():
 if st.session_state["results_displayed"] and st.session_state["loja_mais_proxima_data"]:
     data = st.session_state["loja_mais_proxima_data"]
     st.success("--- Resultado da Pesquisa ---")
-    st.markdown(f"**Endereço Pesquisado:** `{data['endereco_pesquisado']}`")
+    st.markdown(f"**Endereço Pesquisado:** `{data.endereco_pesquisado}`")
     st.markdown(
-        f"**Coordenadas da Origem:** Latitude: **{data['coords_candidato'][0]:.6f}**, Longitude: **{data['coords_candidato'][1]:.6f}**"
+        f"**Coordenadas da Origem:** Latitude: **{data.coords_candidato[0]:.6f}**, Longitude: **{data.coords_candidato[1]:.6f}**"
     )
-    st.markdown(f"A loja mais próxima é: **{data['loja_mais_proxima_nome']}**.")
+    st.markdown(f"A loja mais próxima é: **{data.loja_mais_proxima_nome}**.")
     st.markdown(
-        f"Endereço da Loja Mais Próxima: **`{data['endereco_loja_selecionada']}`**."
+        f"Endereço da Loja Mais Próxima: **`{enderecos_lojas[data.loja_mais_proxima_nome]}`**."
     )
-    st.markdown(f"Distância da rota: **{data['melhor_distancia_km']:.2f} km**.")
+    st.markdown(f"Distância da rota: **{data.melhor_distancia_km:.2f} km**.")
     st.markdown(
-        f"Tempo de viagem estimado: **{data['melhor_tempo_seg'] / 60:.1f} minutos**."
+        f"Tempo de viagem estimado: **{data.melhor_tempo_seg / 60:.1f} minutos**."
     )
 
     st.markdown("---")
     st.subheader("🌍 Mapa da Rota")
+    geometria_rota = obter_geometria_rota(data)
+    if geometria_rota is None:
+        st.info("ℹ️ A rota não está disponível no momento. O mapa mostra apenas a origem e a loja.")
     gerar_mapa_pesquisa(
-        data["coords_candidato"],
-        data["endereco_pesquisado"],
-        data["loja_mais_proxima_nome"],
-        data["coords_loja_selecionada"],
-        data["endereco_loja_selecionada"],
-        data["geometry_rota_selecionada"],
+        data.coords_candidato,
+        data.endereco_pesquisado,
+        data.loja_mais_proxima_nome,
+        data.coords_loja_selecionada,
+        enderecos_lojas[data.loja_mais_proxima_nome],
+        geometria_rota,
     )
+
+# Registra o tamanho do session_state desta sessão para o relatório de memória
+registrar_memoria_sessao()
+registrar_relatorio_memoria()
+
 st.markdown("---")
 st.markdown(
     "Desenvolvido com ❤️ e Streamlit por [Ítalo Gustavo](https://www.linkedin.com/in/italogustavoggsenna/)"
@@ -0,0 +1,124 @@
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import NamedTuple
+
+
+def compactar_geometria(geometry):
+    # Converte a lista GeoJSON [[lon, lat], ...] em um array plano de floats (16 bytes por ponto)
+    coordenadas = array("d")
+    for lon, lat in geometry["coordinates"]:
+        coordenadas.append(lon)
+        coordenadas.append(lat)
+    return coordenadas
+
+
+def coordenadas_lat_lon(coordenadas):
+    # Array plano [lon, lat, lon, lat, ...] -> [[lat, lon], ...], no formato do folium
+    return [
+        [coordenadas[i + 1], coordenadas[i]] for i in range(0, len(coordenadas), 2)
+    ]
+
+
+def tamanho_profundo(obj, vistos=None):
+    # Estimativa recursiva (em bytes) do tamanho de um objeto e de tudo que ele referencia
+    if vistos is None:
+        vistos = set()
+    if id(obj) in vistos or isinstance(obj, type):
+        return 0
+    vistos.add(id(obj))
+    tamanho = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for chave, valor in obj.items():
+            tamanho += tamanho_profundo(chave, vistos) + tamanho_profundo(valor, vistos)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            tamanho += tamanho_profundo(item, vistos)
+    return tamanho
+
+
+class CacheRotas:
+    """Cache LRU de geometrias de rota, compartilhado por todas as sessões do processo."""
+
+    __slots__ = ("_lock", "_rotas", "max_entradas")
+
+    def __init__(self, max_entradas):
+        self._lock = threading.Lock()
+        self._rotas = OrderedDict()
+        self.max_entradas = max_entradas
+
+    def guardar(self, chave, coordenadas):
+        with self._lock:
+            self._rotas[chave] = coordenadas
+            self._rotas.move_to_end(chave)
+            while len(self._rotas) > self.max_entradas:
+                self._rotas.popitem(last=False)
+
+    def obter(self, chave):
+        with self._lock:
+            coordenadas = self._rotas.get(chave)
+            if coordenadas is not None:
+                self._rotas.move_to_end(chave)
+            return coordenadas
+
+    def tamanho_bytes(self):
+        with self._lock:
+            rotas = list(self._rotas.items())
+        return tamanho_profundo(rotas)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._rotas)
+
+
+class ResultadoPesquisa(NamedTuple):
+    """Resultado imutável guardado no session_state; a geometria fica no CacheRotas."""
+
+    endereco_pesquisado: str
+    coords_candidato: tuple
+    loja_mais_proxima_nome: str
+    coords_loja_selecionada: tuple
+    melhor_distancia_km: float
+    melhor_tempo_seg: float
+
+    @property
+    def chave_rota(self):
+        return (tuple(self.coords_candidato), tuple(self.coords_loja_selecionada))
+
+
+class RegistroSessoes:
+    """Tamanho do session_state de cada sessão ativa, para o relatório de memória do processo."""
+
+    __slots__ = ("_lock", "_tamanhos", "_ultimo_relatorio")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tamanhos = {}
+        self._ultimo_relatorio = None
+
+    def registrar(self, session_id, tamanho):
+        with self._lock:
+            self._tamanhos[session_id] = tamanho
+
+    def remover_inativas(self, sessao_ativa):
+        with self._lock:
+            for session_id in list(self._tamanhos):
+                if not sessao_ativa(session_id):
+                    del self._tamanhos[session_id]
+
+    def tamanhos(self):
+        with self._lock:
+            return list(self._tamanhos.values())
+
+    def relatorio_pendente(self, intervalo_seg):
+        agora = time.monotonic()
+        with self._lock:
+            if (
+                self._ultimo_relatorio is not None
+                and agora - self._ultimo_relatorio < intervalo_seg
+            ):
+                return False
+            self._ultimo_relatorio = agora
+            return True
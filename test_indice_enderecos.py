@@ -0,0 +1,101 @@
+from indice_enderecos import IndiceEnderecos, partes_nominatim, separar_rua
+
+
+def criar_indice(max_aprendidos=10):
+    indice = IndiceEnderecos(max_aprendidos)
+    indice.adicionar("Rua Lavras", "Savassi, Belo Horizonte, MG, Brasil")
+    indice.adicionar("Avenida Afonso Pena", "Centro, Belo Horizonte, MG, Brasil")
+    indice.adicionar("", "Savassi, Belo Horizonte, MG, Brasil")
+    indice.adicionar("Rua 7 de Setembro", "Centro, Belo Horizonte, MG, Brasil")
+    return indice
+
+
+def test_sugere_por_prefixo():
+    assert criar_indice().sugerir("rua lav") == [
+        "Rua Lavras, Savassi, Belo Horizonte, MG, Brasil"
+    ]
+
+
+def test_sugere_com_erro_de_uma_letra():
+    indice = criar_indice()
+    assert indice.sugerir("lavrs") == ["Rua Lavras, Savassi, Belo Horizonte, MG, Brasil"]
+    assert indice.sugerir("rua lavrs") == [
+        "Rua Lavras, Savassi, Belo Horizonte, MG, Brasil"
+    ]
+    assert indice.sugerir("afonso pna") == [
+        "Avenida Afonso Pena, Centro, Belo Horizonte, MG, Brasil"
+    ]
+    assert indice.sugerir("savasi")[0] == "Savassi, Belo Horizonte, MG, Brasil"
+
+
+def test_mantem_numero_digitado():
+    sugestoes = criar_indice().sugerir(
+        "Avenida Afonso Pena, 1000, Centro, Belo Horizonte, MG"
+    )
+    assert sugestoes == ["Avenida Afonso Pena, 1000, Centro, Belo Horizonte, MG, Brasil"]
+
+
+def test_aprendidos_expiram_em_ordem_de_uso():
+    indice = criar_indice(max_aprendidos=2)
+    indice.adicionar("Rua Um", "Centro, Belo Horizonte, MG, Brasil", aprendido=True)
+    indice.adicionar("Rua Dois", "Centro, Belo Horizonte, MG, Brasil", aprendido=True)
+    indice.adicionar("Rua Um", "Centro, Belo Horizonte, MG, Brasil", aprendido=True)
+    indice.adicionar("Rua Tres", "Centro, Belo Horizonte, MG, Brasil", aprendido=True)
+    assert len(indice) == 6
+    assert indice.sugerir("rua dois") == []
+    assert indice.sugerir("rua um") == ["Rua Um, Centro, Belo Horizonte, MG, Brasil"]
+
+
+def test_separar_rua_remove_numero():
+    assert separar_rua("Rua Lavras, 96, Savassi, Belo Horizonte, MG, Brasil") == (
+        "Rua Lavras",
+        "Savassi, Belo Horizonte, MG, Brasil",
+    )
+    assert separar_rua("Rua Lavras 96") is None
+
+
+def test_numero_da_casa_em_varios_formatos():
+    indice = criar_indice()
+    lavras = "Savassi, Belo Horizonte, MG, Brasil"
+    assert indice.sugerir("Rua Lavras, nº 96, Savassi") == [f"Rua Lavras, nº 96, {lavras}"]
+    assert indice.sugerir("Rua Lavras, 96 apto 201, Savassi") == [
+        f"Rua Lavras, 96 apto 201, {lavras}"
+    ]
+    assert indice.sugerir("rua lavras 96 savassi") == [f"Rua Lavras, 96, {lavras}"]
+
+
+def test_rua_com_numero_no_nome():
+    indice = criar_indice()
+    centro = "Centro, Belo Horizonte, MG, Brasil"
+    assert indice.sugerir("rua 7 de set") == [f"Rua 7 de Setembro, {centro}"]
+    assert indice.sugerir("Rua 7 de Setembro, 100") == [
+        f"Rua 7 de Setembro, 100, {centro}"
+    ]
+    assert indice.sugerir("rua 7 de setembro 100") == [
+        f"Rua 7 de Setembro, 100, {centro}"
+    ]
+    assert indice.sugerir("rua 7 de setembru") == [f"Rua 7 de Setembro, {centro}"]
+
+
+def test_aprende_do_nominatim_sem_numero_da_casa():
+    # Resposta do Nominatim para "Rua Lavras 96, ...", "Rua Lavras, 96 apto 201, ..." ou "Rua Lavras, nº 96, ..."
+    endereco_nominatim = {
+        "house_number": "96",
+        "road": "Rua Lavras",
+        "suburb": "Savassi",
+        "city": "Belo Horizonte",
+        "state": "Minas Gerais",
+        "ISO3166-2-lvl4": "BR-MG",
+        "country": "Brasil",
+        "country_code": "br",
+    }
+    partes = partes_nominatim(endereco_nominatim)
+    assert partes == ("Rua Lavras", "Savassi, Belo Horizonte, MG, Brasil")
+    indice = IndiceEnderecos(max_aprendidos=10)
+    indice.adicionar(*partes, aprendido=True)
+    assert indice.sugerir("rua lav") == ["Rua Lavras, Savassi, Belo Horizonte, MG, Brasil"]
+
+
+def test_nao_aprende_do_nominatim_sem_rua():
+    assert partes_nominatim({"city": "Belo Horizonte", "country_code": "br"}) is None
+    assert partes_nominatim({"road": "Main Street", "city": "X", "country_code": "us"}) is None
@@ -0,0 +1,67 @@
+from array import array
+
+from memoria import (
+    CacheRotas,
+    RegistroSessoes,
+    ResultadoPesquisa,
+    compactar_geometria,
+    coordenadas_lat_lon,
+    tamanho_profundo,
+)
+
+
+def test_compactar_geometria_ida_e_volta():
+    geometry = {"coordinates": [[-43.93, -19.91], [-43.94, -19.92]]}
+    coordenadas = compactar_geometria(geometry)
+    assert coordenadas == array("d", [-43.93, -19.91, -43.94, -19.92])
+    assert coordenadas_lat_lon(coordenadas) == [[-19.91, -43.93], [-19.92, -43.94]]
+
+
+def test_cache_rotas_descarta_a_menos_usada():
+    cache = CacheRotas(max_entradas=2)
+    cache.guardar("a", array("d", [1.0, 2.0]))
+    cache.guardar("b", array("d", [3.0, 4.0]))
+    assert cache.obter("a") is not None  # "a" passa a ser a mais recente
+    cache.guardar("c", array("d", [5.0, 6.0]))
+    assert len(cache) == 2
+    assert cache.obter("b") is None
+    assert cache.obter("a") == array("d", [1.0, 2.0])
+    assert cache.obter("c") == array("d", [5.0, 6.0])
+
+
+def test_cache_rotas_regravar_atualiza_ordem():
+    cache = CacheRotas(max_entradas=2)
+    cache.guardar("a", array("d"))
+    cache.guardar("b", array("d"))
+    cache.guardar("a", array("d", [1.0, 2.0]))
+    cache.guardar("c", array("d"))
+    assert cache.obter("b") is None
+    assert cache.obter("a") == array("d", [1.0, 2.0])
+
+
+def test_tamanho_profundo_conta_resultado_e_array():
+    resultado = ResultadoPesquisa(
+        "Rua Lavras, 96", (-19.93, -43.93), "Loja Savassi", (-19.94, -43.94), 1.5, 300.0
+    )
+    coordenadas = array("d", [0.0] * 1000)
+    assert tamanho_profundo(resultado) > tamanho_profundo(())
+    assert tamanho_profundo(coordenadas) >= 8000
+    assert tamanho_profundo([resultado, coordenadas]) >= (
+        tamanho_profundo(resultado) + tamanho_profundo(coordenadas)
+    )
+    assert resultado.chave_rota == ((-19.93, -43.93), (-19.94, -43.94))
+
+
+def test_registro_sessoes_remove_inativas():
+    registro = RegistroSessoes()
+    registro.registrar("s1", 100)
+    registro.registrar("s2", 200)
+    registro.remover_inativas(lambda session_id: session_id == "s2")
+    assert registro.tamanhos() == [200]
+
+
+def test_registro_sessoes_relatorio_pendente():
+    registro = RegistroSessoes()
+    assert registro.relatorio_pendente(300)
+    assert not registro.relatorio_pendente(300)
+    assert registro.relatorio_pendente(0)